@@ -47,6 +47,8 @@ from sklearn.metrics.pairwise import pairwise_distances
 
 to compute distances between 2 sets of samples.
 """
+import numbers
+
 import numpy as np
 import pandas as pd
 
@@ -55,17 +57,107 @@ from sklearn.base import ClassifierMixin
 
 from sklearn.model_selection import BaseCrossValidator
 
-from sklearn.utils.validation import check_X_y, check_is_fitted
-from sklearn.utils.validation import check_array
+from sklearn.utils.validation import check_consistent_length, column_or_1d
+from sklearn.utils.validation import check_is_fitted, validate_data
 from sklearn.utils.multiclass import check_classification_targets
-from sklearn.metrics.pairwise import pairwise_distances
+from sklearn.utils import gen_batches
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Size of the distance block computed at once in `KNearestNeighbors.predict`,
+# chosen so that the block stays in a typical L2 cache.
+_CHUNK_BYTES = 256 * 1024
+
+
+if numba is not None:
+    # Only reassociation and FMA contraction are allowed so the feature loop
+    # vectorizes: the insertion buffer relies on `inf` as a sentinel.
+    @numba.njit(parallel=True, fastmath={"reassoc", "contract"}, cache=True)
+    def _knn_predict_kernel(X_test, X_train, y_codes, k, n_classes):
+        """Predict class codes with a fused distance and k-argmin pass.
+
+        Each test row keeps its k smallest squared distances in a sorted
+        buffer, so the (n_test, n_train) distance matrix is never built.
+        """
+        n_test, n_features = X_test.shape
+        n_train = X_train.shape[0]
+        y_pred = np.empty(n_test, dtype=np.intp)
+        for i in numba.prange(n_test):
+            best_dist = np.full(k, np.inf)
+            best_idx = np.zeros(k, dtype=np.intp)
+            for j in range(n_train):
+                dist = 0.0
+                for f in range(n_features):
+                    diff = X_test[i, f] - X_train[j, f]
+                    dist += diff * diff
+                if dist < best_dist[k - 1]:
+                    pos = k - 1
+                    while pos > 0 and best_dist[pos - 1] > dist:
+                        best_dist[pos] = best_dist[pos - 1]
+                        best_idx[pos] = best_idx[pos - 1]
+                        pos -= 1
+                    best_dist[pos] = dist
+                    best_idx[pos] = j
+            counts = np.zeros(n_classes, dtype=np.intp)
+            for m in range(k):
+                counts[y_codes[best_idx[m]]] += 1
+            y_pred[i] = np.argmax(counts)
+        return y_pred
 
 
-class KNearestNeighbors(BaseEstimator, ClassifierMixin):
-    """KNearestNeighbors classifier."""
+def _check_distance_range(X, center):
+    """Raise a ValueError if squared distances between rows may overflow.
 
-    def __init__(self, n_neighbors=1):  # noqa: D107
+    With all entries of `X - center` bounded by `limit`, squared norms, dot
+    products and squared distances of the shifted rows, as well as squared
+    differences of the raw rows, stay below the largest float of `X.dtype`.
+    """
+    limit = np.sqrt(np.finfo(X.dtype).max / (8 * X.shape[1]))
+    with np.errstate(over='ignore'):
+        extent = max(
+            (X.max(axis=0) - center).max(), (center - X.min(axis=0)).max()
+        )
+    if extent > limit:
+        raise ValueError(
+            f"Input values are too large to compute squared Euclidean "
+            f"distances in {X.dtype}: centered values must stay within "
+            f"+/-{limit:.3g}. Rescale the data."
+        )
+
+
+class KNearestNeighbors(ClassifierMixin, BaseEstimator):
+    """KNearestNeighbors classifier.
+
+    Parameters
+    ----------
+    n_neighbors : int, defaults to 1
+        Number of neighbors voting for the predicted class.
+    dtype : {np.float64, np.float32}, defaults to np.float64
+        Floating point type used to store the data and compute distances.
+        `np.float32` halves the memory traffic of `predict` at the cost of
+        precision. With `algorithm='numpy'`, distances are ranked from dot
+        products of the data shifted by its mean, computed in this type: a
+        common offset of the data is harmless, but neighbors closer to each
+        other than about sqrt(eps) times their distance to the mean of the
+        training data (eps being 1e-16 for float64 and 1e-7 for float32)
+        may be ranked wrongly, e.g. for tight clusters far apart. The
+        'numba' backend subtracts rows directly and is not affected.
+    algorithm : {'numpy', 'numba'}, defaults to 'numpy'
+        Backend used by `predict`. 'numpy' ranks chunks of distances computed
+        with BLAS, 'numba' runs a compiled kernel and requires numba to be
+        installed. When several training samples tie for the last neighbor,
+        'numba' keeps the ones seen first while 'numpy' keeps an arbitrary
+        subset of them, so the two backends may then predict differently.
+    """
+
+    def __init__(self, n_neighbors=1, dtype=np.float64,
+                 algorithm='numpy'):  # noqa: D107
         self.n_neighbors = n_neighbors
+        self.dtype = dtype
+        self.algorithm = algorithm
 
     def fit(self, X, y):
         """Fitting function.
@@ -82,6 +174,56 @@ class KNearestNeighbors(BaseEstimator, ClassifierMixin):
         self : instance of KNearestNeighbors
             The current instance of the classifier
         """
+        if (not isinstance(self.n_neighbors, numbers.Integral)
+                or self.n_neighbors < 1):
+            raise ValueError(
+                f"n_neighbors must be an integer >= 1, "
+                f"got {self.n_neighbors!r}."
+            )
+        if self.dtype not in (np.float64, np.float32):
+            raise ValueError(
+                f"dtype must be np.float64 or np.float32, got {self.dtype!r}."
+            )
+        if self.algorithm not in ('numpy', 'numba'):
+            raise ValueError(
+                f"algorithm must be 'numpy' or 'numba', "
+                f"got {self.algorithm!r}."
+            )
+        if self.algorithm == 'numba' and numba is None:
+            raise ImportError("algorithm='numba' requires numba.")
+        # C-contiguous rows let BLAS and the numba kernel run on the stored
+        # data as is, without a hidden copy at every call to `predict`.
+        X, y = validate_data(self, X, y, dtype=self.dtype, order="C")
+        check_classification_targets(y)
+        # Labels are kept as integer codes into `classes_` so that voting in
+        # `predict` only works on integer arrays.
+        self.classes_, self._label_codes = np.unique(y, return_inverse=True)
+        self._n_classes = self.classes_.shape[0]
+
+        self.examples_ = X
+
+        # Distances are computed on centered data: they do not change, but
+        # the GEMM trick in `predict` no longer subtracts large norms when
+        # the data has an offset. The mean is rounded to a power of two
+        # below the range of each feature, so the shift stays exact on
+        # grid-valued data and exact distance ties are preserved. Features
+        # whose range or mean overflows are left unshifted.
+        with np.errstate(over='ignore'):
+            spread = np.ptp(X, axis=0)
+            usable = np.isfinite(spread) & (spread > 0)
+            step = np.exp2(np.floor(
+                np.log2(spread, out=np.zeros_like(spread), where=usable)
+            ))
+            center = np.round(X.mean(axis=0) / step) * step
+        self._center = np.where(np.isfinite(center), center, 0)
+        _check_distance_range(X, self._center)
+        # The numba kernel subtracts rows directly and needs no shift, which
+        # would only cost precision on data clustered away from the mean.
+        if self.algorithm == 'numpy':
+            self._shifted_examples = X - self._center
+            self._sq_norms = np.einsum(
+                "ij,ij->i", self._shifted_examples, self._shifted_examples
+            )
         return self
 
     def predict(self, X):
@@ -97,7 +239,58 @@ class KNearestNeighbors(BaseEstimator, ClassifierMixin):
         y : ndarray, shape (n_test_samples,)
             Predicted class labels for each test data sample.
         """
-        y_pred = np.zeros(X.shape[0])
+        check_is_fitted(self)
+        # Only the numba kernel reads the validated X as is; the numpy path
+        # shifts it below, which makes a C-contiguous copy anyway.
+        X = validate_data(
+            self, X, reset=False, dtype=self.examples_.dtype,
+            order="C" if self.algorithm == 'numba' else None
+        )
+        _check_distance_range(X, self._center)
+        n_neighbors = self.n_neighbors
+        if n_neighbors > self.examples_.shape[0]:
+            raise ValueError(
+                f"Expected n_neighbors <= n_samples_fit, but n_neighbors = "
+                f"{n_neighbors}, n_samples_fit = {self.examples_.shape[0]}."
+            )
+
+        if self.algorithm == 'numba':
+            codes = _knn_predict_kernel(
+                X, self.examples_, self._label_codes, n_neighbors,
+                self._n_classes
+            )
+            return self.classes_[codes]
+
+        # Same shift as the training data, see `fit`. This O(n_test * d) copy
+        # is accepted: it is small next to the O(n_test * n_train * d) GEMM,
+        # and folding the shift into the GEMM as a per-sample constant would
+        # bring back the cancellation the shift is there to avoid.
+        X = np.subtract(X, self._center, order="C")
+
+        # Neighbors are ranked on ||y||^2 - 2 x.y, i.e. the squared Euclidean
+        # distance minus ||x||^2: the ranking of a row does not change, and
+        # neither the sqrt nor the per-row constant have to be computed.
+        # Each chunk of test samples costs one BLAS call and is reduced to
+        # the k nearest right away, so the full (n_test, n_train) matrix is
+        # never materialized.
+        n_test, n_train = X.shape[0], self.examples_.shape[0]
+        chunk_size = max(1, _CHUNK_BYTES // (X.itemsize * n_train))
+        neighbors = np.empty((n_test, n_neighbors), dtype=np.intp)
+        for batch in gen_batches(n_test, chunk_size):
+            distances = X[batch] @ self._shifted_examples.T
+            distances *= -2
+            distances += self._sq_norms
+            # Partial sort: only the k smallest distances are needed.
+            neighbors[batch] = np.argpartition(
+                distances, n_neighbors - 1, axis=1
+            )[:, :n_neighbors]
+
+        # Majority vote: count the class codes of the neighbors of each row.
+        # On ties argmax keeps the smallest class, as scikit-learn does.
+        neighbor_codes = self._label_codes[neighbors]
+        counts = np.zeros((n_test, self._n_classes), dtype=np.int32)
+        np.add.at(counts, (np.arange(n_test)[:, None], neighbor_codes), 1)
+        y_pred = self.classes_[counts.argmax(axis=1)]
         return y_pred
 
     def score(self, X, y):
@@ -115,7 +308,11 @@ class KNearestNeighbors(BaseEstimator, ClassifierMixin):
         score : float
             Accuracy of the model computed for the (X, y) pairs.
         """
-        return 0.
+        # `predict` validates X; y only has to match it in length and is
+        # raveled like in `fit`, so that a column vector does not broadcast.
+        check_consistent_length(X, y)
+        y = column_or_1d(y)
+        return float(np.mean(self.predict(X) == y))
 
 
 class MonthlySplit(BaseCrossValidator):
@@ -137,6 +334,44 @@ class MonthlySplit(BaseCrossValidator):
     def __init__(self, time_col='index'):  # noqa: D107
         self.time_col = time_col
 
+    def _compute_splits(self, X):
+        """Return the months used by each split and the month of each row.
+
+        Months are represented by integer codes numbering the months present
+        in `X` in time order.
+
+        Parameters
+        ----------
+        X : DataFrame or Series
+            Data to split, with the `time_col` column or a datetime index.
+
+        Returns
+        -------
+        train_codes : ndarray of int
+            The code of the training month of each split, in time order. The
+            testing month of a split has the next code.
+        period_codes : ndarray of int of shape (n_samples,)
+            The code of the month of each row of `X`.
+        """
+        if self.time_col == 'index':
+            time_data = X.index
+        else:
+            time_data = X[self.time_col]
+        if not pd.api.types.is_datetime64_any_dtype(time_data):
+            raise ValueError(
+                f"The column '{self.time_col}' should be of type datetime, "
+                f"got {time_data.dtype}."
+            )
+
+        # One split per pair of consecutive months present in the data.
+        # Monthly periods make year boundaries (Dec -> Jan) a plain +1.
+        # Months are taken on the local wall clock of tz-aware data; dropping
+        # the timezone first avoids pandas' warning on every call.
+        months = pd.DatetimeIndex(time_data).tz_localize(None).to_period('M')
+        period_codes, periods = pd.factorize(months, sort=True)
+        train_codes = np.flatnonzero(periods[:-1] + 1 == periods[1:])
+        return train_codes, period_codes
+
     def get_n_splits(self, X, y=None, groups=None):
         """Return the number of splitting iterations in the cross-validator.
 
@@ -155,7 +390,8 @@ class MonthlySplit(BaseCrossValidator):
         n_splits : int
             The number of splits.
         """
-        return 0
+        train_codes, _ = self._compute_splits(X)
+        return len(train_codes)
 
     def split(self, X, y, groups=None):
         """Generate indices to split data into training and test set.
@@ -172,17 +408,24 @@ class MonthlySplit(BaseCrossValidator):
 
         Yields
         ------
-        idx_train : ndarray
-            The training set indices for that split.
-        idx_test : ndarray
-            The testing set indices for that split.
+        idx_train : ndarray of int
+            The training set indices for that split, as positions in `X`.
+        idx_test : ndarray of int
+            The testing set indices for that split, as positions in `X`.
         """
-
-        n_samples = X.shape[0]
-        n_splits = self.get_n_splits(X, y, groups)
-        for i in range(n_splits):
-            idx_train = range(n_samples)
-            idx_test = range(n_samples)
+        train_codes, period_codes = self._compute_splits(X)
+
+        # `sort_perm` lists the original positions of the rows in time order,
+        # so each month is a contiguous slice of it, found by binary search.
+        # A stable sort keeps the positions of a month in increasing order.
+        sort_perm = np.argsort(period_codes, kind='stable')
+        sorted_codes = period_codes[sort_perm]
+        for code in train_codes:
+            start, middle, stop = np.searchsorted(
+                sorted_codes, [code, code + 1, code + 2]
+            )
+            idx_train = sort_perm[start:middle]
+            idx_test = sort_perm[middle:stop]
             yield (
                 idx_train, idx_test
             )